@@ -8,9 +8,10 @@ dimensions. The button is the solve button.
 Inspiration was taken from TechWithTim.
 """
 
-from sudoku import make_puzzle_board, valid_move, solve_board_possible
-from cell import Cell
-from config import NUM_CELLS
+from sudoku import make_puzzle_board
+from cell import Cell, get_glyph
+from config import NUM_CELLS, SCREEN_WIDTH, SCREEN_HEIGHT
+import array
 import pygame
 
 
@@ -33,26 +34,111 @@ class Board:
         self.selected_cell = None
         self.comment = "Let's play!"
 
+        # A plain int mirror of the cell values, kept in sync by _set_value, so checking a move doesn't have to
+        # rebuild an 81 element list from the Cell objects every single time.
+        self._int_grid = [[self.puzzle[r][c].value for c in range(self.num_cols)] for r in range(self.num_rows)]
+
+        # How many cells currently hold a value, kept up to date by _set_value, so is_finished is one compare instead
+        # of a walk over all 81 cells every frame.
+        self.filled_count = sum(1 for r in range(self.num_rows) for c in range(self.num_cols)
+                                if self._int_grid[r][c] != 0)
+
+        # 9 bit masks of which values are already used in each row, column and 3x3 box. Bit (v - 1) of row_used[r] is
+        # set when value v is somewhere in row r, so testing whether a value can go in a cell is a couple of integer
+        # operations instead of scanning 27 cells.
+        self.row_used = array.array('H', [0] * 9)
+        self.col_used = array.array('H', [0] * 9)
+        self.box_used = array.array('H', [0] * 9)
+
+        for r in range(self.num_rows):
+            for c in range(self.num_cols):
+                if self._int_grid[r][c] != 0:
+                    self._place(r, c, self._int_grid[r][c])
+
         self.button_x = None
         self.button_y = None
         self.button_width = None
         self.button_height = None
+        self._button_rect = None
+
+        # A static background Surface with the white fill and the grid lines drawn once, so that a redraw only has to
+        # copy the square underneath a changed cell back instead of re-drawing all of the lines. convert() puts it in
+        # the same pixel format as the screen, which keeps the copies cheap.
+        self._bg = pygame.Surface((width, height)).convert()
+        self._bg.fill((255, 255, 255))
+
+        gap = self.width / 9
+        for i in range(self.num_rows + 1):
+            if i % 3 == 0:
+                thick = 4
+            else:
+                thick = 1
+            pygame.draw.line(self._bg, (0, 0, 0), (0, i * gap), (self.width, i * gap), thick)
+            pygame.draw.line(self._bg, (0, 0, 0), (i * gap, 0), (i * gap, self.height), thick)
+
+        # The first call to draw has to paint the whole window once; after that, only dirty cells are repainted.
+        self._full_redraw = True
+        self._last_comment = None
+        self._last_comment_rect = None
 
     """
-    This function determines whether or not a value the player places in a certain cell is a valid value. To be valid, 
-    the cell must be changeable and it must be a valid move. 
+    These two functions flip value val's bit in the row, column and box masks when a value is placed into or removed
+    from a cell.
+    """
+
+    def _place(self, row, col, val):
+        bit = 1 << (val - 1)
+        self.row_used[row] |= bit
+        self.col_used[col] |= bit
+        self.box_used[(row // 3) * 3 + col // 3] |= bit
+
+    def _unplace(self, row, col, val):
+        bit = 1 << (val - 1)
+        self.row_used[row] ^= bit
+        self.col_used[col] ^= bit
+        self.box_used[(row // 3) * 3 + col // 3] ^= bit
+
+    """
+    This function checks, with the bit masks, whether or not placing value val at row, col would clash with a value
+    already in the same row, column or box.
+    """
+
+    def _can_place(self, row, col, val):
+        mask = self.row_used[row] | self.col_used[col] | self.box_used[(row // 3) * 3 + col // 3]
+        return not (mask >> (val - 1)) & 1
+
+    """
+    This function writes a value into the Cell object, the int grid mirror, and the row/column/box masks, so they all
+    always agree. All cell value writes on the board go through here.
+    """
+
+    def _set_value(self, row, col, val):
+        old_val = self._int_grid[row][col]
+        if old_val != 0:
+            self._unplace(row, col, old_val)
+        if val != 0:
+            self._place(row, col, val)
+
+        if old_val == 0 and val != 0:
+            self.filled_count += 1
+        elif old_val != 0 and val == 0:
+            self.filled_count -= 1
+
+        self.puzzle[row][col].value = val
+        self._int_grid[row][col] = val
+
+    """
+    This function determines whether or not a value the player places in a certain cell is a valid value. To be valid,
+    the cell must be changeable and it must be a valid move.
     """
 
     def value_correct(self, val):
         row, col = self.selected_cell
         if self.puzzle[row][col].value == 0:
-            self.puzzle[row][col].value = val
-            test_puzzle = [[self.puzzle[i][j].value for j in range(self.num_cols)] for i in range(self.num_rows)]
-
-            if valid_move(row, col, val, test_puzzle) and self.puzzle[row][col].changeable:
+            if self._can_place(row, col, val) and self.puzzle[row][col].changeable:
+                self._set_value(row, col, val)
                 return True
 
-            self.puzzle[row][col].value = 0
             self.puzzle[row][col].temp = 0
 
         return False
@@ -61,27 +147,29 @@ class Board:
     """
     This function draws the comment given to the bottom left corner of the board. 
     """
-    def add_comment(self, font, window):
-        text = font.render(self.comment, True, (0, 0, 0))
-        width, height = pygame.display.get_surface().get_size()
-        window.blit(text, (0, height - text.get_height()))
+    def add_comment(self, window):
+        text, text_width, text_height = get_glyph(self.comment, (0, 0, 0))
+        window.blit(text, (0, SCREEN_HEIGHT - text_height))
 
     """
-    This function draws the solve button in the bottom center of the board. 
+    This function draws the solve button in the bottom center of the board.
     """
-    def draw_solve_button(self, font, window):
-        text = font.render("Solve", True, (0, 0, 0))
-        width, height = pygame.display.get_surface().get_size()
-        x = ((width - text.get_width()) / 2) - 10
-        y = height - text.get_height() - 10
+    def draw_solve_button(self, window):
+        text, text_width, text_height = get_glyph("Solve", (0, 0, 0))
 
-        pygame.draw.rect(window, (52, 216, 235), (x, y, text.get_width() + 20, text.get_height() + 30))
-        window.blit(text, (x, y))
+        # The button never moves, so its Rect is built once and reused on every draw after that.
+        if self._button_rect is None:
+            x = ((SCREEN_WIDTH - text_width) / 2) - 10
+            y = SCREEN_HEIGHT - text_height - 10
+            self._button_rect = pygame.Rect(x, y, text_width + 20, text_height + 30)
 
-        self.button_x = x
-        self.button_y = y
-        self.button_width = text.get_width() + 20
-        self.button_height = text.get_height() + 30
+            self.button_x = x
+            self.button_y = y
+            self.button_width = text_width + 20
+            self.button_height = text_height + 30
+
+        pygame.draw.rect(window, (52, 216, 235), self._button_rect)
+        window.blit(text, (self.button_x, self.button_y))
 
     """
     This function checks whether or not the player has clicked on the "Solve" button. 
@@ -93,39 +181,105 @@ class Board:
                and self.button_y <= y <= self.button_y + self.button_height
 
     """
-    This function draws the board. It creates both thick and thin lines, then draws in the cells, the comment at the
-    bottom, and then the solve button. 
+    This function draws the board and returns the list of rectangles that were actually repainted, so that the caller
+    can hand them to pygame.display.update and only push those bits to the screen.
+
+    On the very first call everything gets painted: the background grid, all of the cells, the comment and the solve
+    button. After that, only the cells marked dirty get repainted. For each dirty cell, the grid background underneath
+    it is copied back first, and then every cell touching the restored area is redrawn so no neighbouring numbers get
+    wiped out. The comment (and the button, in case a long comment runs into it) is only redrawn when it changes.
     """
     def draw(self, window):
-        gap = self.width / 9
-        for i in range(self.num_rows + 1):
-            if i % 3 == 0:
-                thick = 4
-            else:
-                thick = 1
-            pygame.draw.line(window, (0, 0, 0), (0, i * gap), (self.width, i * gap), thick)
-            pygame.draw.line(window, (0, 0, 0), (i * gap, 0), (i * gap, self.height), thick)
+        if self._full_redraw:
+            # The background Surface only covers the board square, so white out the whole window first for the strip
+            # below the grid where the comment and the solve button live.
+            window.fill((255, 255, 255))
+            window.blit(self._bg, (0, 0))
+
+            # Draw the cells.
+            for i in range(self.num_rows):
+                for j in range(self.num_cols):
+                    self.puzzle[i][j].draw_cell(window)
+                    self.puzzle[i][j]._dirty = False
+
+            # draw in the comment
+            self.add_comment(window)
+
+            # Draw in the "Solve" button
+            self.draw_solve_button(window)
+
+            self._full_redraw = False
+            self._last_comment = self.comment
+
+            # Remember where the comment went, so the first comment change knows how much to white out.
+            text, text_width, text_height = get_glyph(self.comment, (0, 0, 0))
+            self._last_comment_rect = pygame.Rect(0, SCREEN_HEIGHT - text_height, text_width, text_height)
+
+            return [window.get_rect()]
+
+        dirty_rects = []
 
-        # Draw the cells.
+        # Copy the background back underneath every cell that changed since the last frame.
         for i in range(self.num_rows):
             for j in range(self.num_cols):
-                self.puzzle[i][j].draw_cell(window)
+                if self.puzzle[i][j]._dirty:
+                    rect = self.puzzle[i][j].dirty_rect().clip(self._bg.get_rect())
+                    window.blit(self._bg, rect, rect)
+                    dirty_rects.append(rect)
+
+        # Redraw every cell whose drawing area touches a restored patch, dirty or not, so that numbers in
+        # neighbouring cells that got covered up reappear.
+        if dirty_rects:
+            for i in range(self.num_rows):
+                for j in range(self.num_cols):
+                    if self.puzzle[i][j].dirty_rect().collidelist(dirty_rects) != -1:
+                        self.puzzle[i][j].draw_cell(window)
+                    self.puzzle[i][j]._dirty = False
+
+        # Redraw the comment only when it changed. The old comment is covered up with white first, and the button is
+        # redrawn too in case the old comment was long enough to run into it.
+        if self.comment != self._last_comment:
+            text, text_width, text_height = get_glyph(self.comment, (0, 0, 0))
+
+            comment_rect = pygame.Rect(0, SCREEN_HEIGHT - text_height, text_width, text_height)
+            clear_rect = comment_rect
+            if self._last_comment_rect is not None:
+                clear_rect = comment_rect.union(self._last_comment_rect)
+
+            window.fill((255, 255, 255), clear_rect)
+            self.add_comment(window)
+            self.draw_solve_button(window)
+
+            self._last_comment = self.comment
+            self._last_comment_rect = comment_rect
+            dirty_rects.append(clear_rect)
+            dirty_rects.append(self._button_rect)
+
+        return dirty_rects
 
-        # draw in the comment
-        font = pygame.font.SysFont("comicsans", 40)
-        self.add_comment(font, window)
+    """
+    This function checks whether or not anything on the board has changed since it was last drawn, so the game loop
+    can skip redrawing entirely on frames where nothing happened.
+    """
+    def needs_redraw(self):
+        if self._full_redraw or self.comment != self._last_comment:
+            return True
 
-        # Draw in the "Solve" button
-        self.draw_solve_button(font, window)
+        for i in range(self.num_rows):
+            for j in range(self.num_cols):
+                if self.puzzle[i][j]._dirty:
+                    return True
+
+        return False
 
     """
-    This function sets the specificed cell at row, col to be selected and all other cells to be not selected. 
+    This function sets the specificed cell at row, col to be selected and all other cells to be not selected.
     """
     def select(self, row, col):
-        # Reset all other
-        for i in range(self.num_rows):
-            for j in range(self.num_cols):
-                self.puzzle[i][j].selected = False
+        # At most one cell is ever selected, so only that one needs resetting.
+        if self.selected_cell is not None:
+            prev_row, prev_col = self.selected_cell
+            self.puzzle[prev_row][prev_col].selected = False
 
         self.puzzle[row][col].selected = True
         self.selected_cell = (row, col)
@@ -136,7 +290,7 @@ class Board:
     def remove_value_temp(self):
         row, col = self.selected_cell
         if self.puzzle[row][col].changeable:
-            self.puzzle[row][col].value = 0
+            self._set_value(row, col, 0)
             self.puzzle[row][col].temp = 0
 
     """
@@ -156,38 +310,84 @@ class Board:
     This function checks whether or not the board is complete.  
     """
     def is_finished(self):
-        for row in range(self.num_rows):
-            for col in range(self.num_cols):
-                if self.puzzle[row][col].value == 0:
-                    return False
-        return True
+        return self.filled_count == NUM_CELLS
 
     """
-    This function visualizes the backtracking algorithm on the board itself. 
+    This function visualizes the backtracking algorithm on the board itself.
+
+    Instead of always working on the next empty cell left to right, each step picks the empty cell with the fewest
+    legal candidates left. A cell with one candidate is forced, so filling those first keeps the search tree tiny,
+    and if any empty cell has no candidates at all the branch can fail straight away without trying anything.
+
+    The search runs on an explicit stack of [row, col, remaining candidate mask] frames instead of recursing, so an
+    adversarial board can't run into Python's recursion limit. The top of the stack is the cell being worked on, and
+    its mask holds the candidates it hasn't tried yet.
     """
-    def solve_board_gui(self, test_puzzle):
-        for row in range(9):
-            for col in range(9):
-                if self.puzzle[row][col].value == 0:
-                    for num in range(1, 10):
-                        test_puzzle = [[self.puzzle[i][j].value for j in range(self.num_cols)] for i in
-                                       range(self.num_rows)]
-                        if valid_move(row, col, num, test_puzzle):
-                            test_puzzle[row][col] = num
-                            self.puzzle[row][col].value = num
-                            self.puzzle[row][col].draw_solve_gui_cell(self.win, True)
-                            pygame.display.update()
-                            pygame.time.delay(150)
-
-                            if self.solve_board_gui(test_puzzle):
-                                return True
-
-                            self.puzzle[row][col].value = 0
-                            self.puzzle[row][col].draw_solve_gui_cell(self.win, False)
-                            pygame.display.update()
-                            pygame.time.delay(150)
-                    return False
-        return True
+    def solve_board_gui(self):
+        stack = []
+
+        while True:
+            # Find the most constrained empty cell. cand is the bit mask of values still legal for the cell, and
+            # dead_end means some empty cell has nothing legal left, so the placements so far can't work.
+            best_cell = None
+            best_cand = 0
+            best_count = 10
+            dead_end = False
+
+            for row in range(9):
+                if dead_end:
+                    break
+                for col in range(9):
+                    if self.puzzle[row][col].value == 0:
+                        cand = ~(self.row_used[row] | self.col_used[col]
+                                 | self.box_used[(row // 3) * 3 + col // 3]) & 0x1FF
+                        count = cand.bit_count()
+
+                        if count == 0:
+                            dead_end = True
+                            break
+
+                        if count < best_count:
+                            best_cell = (row, col)
+                            best_cand = cand
+                            best_count = count
+
+            if not dead_end:
+                # No empty cells left, so the board is solved.
+                if best_cell is None:
+                    return True
+
+                stack.append([best_cell[0], best_cell[1], best_cand])
+
+            # Hand the top cell its next untried candidate, backing out of cells that have run dry. Peeling off the
+            # lowest set bit of the mask gives each candidate in turn without testing all nine values. A freshly
+            # pushed cell holds no value yet and goes straight to its first candidate.
+            advanced = False
+            while stack and not advanced:
+                row, col, cand = stack[-1]
+
+                if self.puzzle[row][col].value != 0:
+                    self._set_value(row, col, 0)
+                    self.puzzle[row][col].draw_solve_gui_cell(self.win, False)
+                    pygame.display.update()
+                    pygame.time.delay(150)
+
+                if cand == 0:
+                    stack.pop()
+                    continue
+
+                bit = cand & -cand
+                stack[-1][2] = cand ^ bit
+
+                self._set_value(row, col, bit.bit_length())
+                self.puzzle[row][col].draw_solve_gui_cell(self.win, True)
+                pygame.display.update()
+                pygame.time.delay(150)
+                advanced = True
+
+            # The stack ran out with no candidate left anywhere, so the board is unsolvable.
+            if not advanced:
+                return False
 
     """
     This function resets the board to what is originally used to be. It sets all changeable values to 0, all temp values
@@ -197,15 +397,9 @@ class Board:
         for row in range(9):
             for col in range(9):
                 if self.puzzle[row][col].changeable:
-                    self.puzzle[row][col].value = 0
+                    self._set_value(row, col, 0)
                     self.puzzle[row][col].temp = 0
 
-                    cell_width = self.width / 9
-                    cell_height = cell_width
-
-                    x = col * cell_width
-                    y = row * cell_height
-
-                    # Cover up any old/wrong numbers with a white rectangle.
-                    # Changes to x, y were made just to cover the middle bits and leave the border black
-                    pygame.draw.rect(window, (255, 255, 255), (x + 5, y + 5, cell_width - 10, cell_width - 10))
\ No newline at end of file
+                    # Cover up any old/wrong numbers with a white rectangle. The cell's pre-built inner rectangle
+                    # covers just the middle bits and leaves the border black.
+                    pygame.draw.rect(window, (255, 255, 255), self.puzzle[row][col].inner_rect)
\ No newline at end of file
@@ -9,9 +9,52 @@ rectangle that goes around the border when it is selected.
 Inspiration was taken from TechWithTim.
 """
 import pygame
-from sudoku import make_puzzle_board, valid_move, solve_board_possible
 from config import NUM_CELLS
 
+# The one font used everywhere, made once. Building a SysFont and rendering text are the most expensive calls in the
+# drawing loop, so both are done lazily, once, and cached below.
+_FONT = None
+
+# Maps (text, color) to a tuple of (rendered Surface, its width, its height).
+_GLYPH_CACHE = {}
+
+"""
+This function renders a piece of text in a certain color and returns the Surface along with its width and height,
+without caching anything. It is for text that is different nearly every time it is drawn, like the ticking timer:
+caching that would grow the cache by one never-again-used Surface per tick, a memory leak in all but name.
+"""
+
+
+def render_glyph(text, color):
+    global _FONT
+
+    if _FONT is None:
+        _FONT = pygame.font.SysFont("comicsans", 40)
+
+    # convert_alpha makes the Surface match the display format, so blitting it later is much faster. It only
+    # works once pygame.display.set_mode has been called, which is why the font and the cache fill in lazily here
+    # instead of at import time.
+    surface = _FONT.render(str(text), True, color).convert_alpha()
+
+    return surface, surface.get_width(), surface.get_height()
+
+
+"""
+This function returns the pre-rendered Surface for a piece of text in a certain color, along with its width and height.
+The first time a (text, color) pair is asked for, it is rendered and cached; every time after that, the cached Surface
+is handed back so nothing has to be re-rendered frame after frame. The cache is never emptied, so it is only for the
+small fixed set of texts the game draws over and over - the digits, the comments and the button label.
+"""
+
+
+def get_glyph(text, color):
+    key = (str(text), color)
+
+    if key not in _GLYPH_CACHE:
+        _GLYPH_CACHE[key] = render_glyph(key[0], color)
+
+    return _GLYPH_CACHE[key]
+
 
 class Cell:
     """
@@ -26,11 +69,70 @@ class Cell:
         self.col = col
         self.board_width = width
         self.board_height = height
-        self.value = value
-        self.temp = 0
-        self.selected = False
+
+        # The cell's fixed geometry, computed once instead of on every draw: its size, its top left corner on the
+        # board, and the inner rectangle used to cover up old numbers while leaving the grid lines alone.
+        self.cell_width = width / 9
+        self.cell_height = self.cell_width
+        self.x = col * self.cell_width
+        self.y = row * self.cell_height
+        self.inner_rect = pygame.Rect(self.x + 5, self.y + 5, self.cell_width - 10, self.cell_height - 10)
+
+        # Reusable Rects, so drawing doesn't allocate a fresh tuple per call: the green selection square (moved into
+        # place before each draw) and the fixed area this cell's drawing can ever touch.
+        self.select_rect = pygame.Rect(self.x, self.y, self.cell_width, self.cell_height)
+        self._dirty_area = self.select_rect.union(self.select_rect.move(-25, -15))
+
+        self._value = value
+        self._temp = 0
+        self._selected = False
         self.line_thickness = 2
 
+        # Whether or not the cell has changed since it was last drawn. Starts out True so every cell gets drawn on the
+        # very first frame.
+        self._dirty = True
+
+    """
+    The value, temp and selected attributes are properties so that any change to them marks the cell as dirty. The
+    board then only has to redraw the cells that actually changed instead of all 81 every frame.
+    """
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, new_value):
+        if new_value != self._value:
+            self._value = new_value
+            self._dirty = True
+
+    @property
+    def temp(self):
+        return self._temp
+
+    @temp.setter
+    def temp(self, new_temp):
+        if new_temp != self._temp:
+            self._temp = new_temp
+            self._dirty = True
+
+    @property
+    def selected(self):
+        return self._selected
+
+    @selected.setter
+    def selected(self, new_selected):
+        if new_selected != self._selected:
+            self._selected = new_selected
+            self._dirty = True
+
+    """
+    This function returns the rectangle of the screen that drawing this cell can touch. That is the cell's own square,
+    plus the shifted square that the green selection box is drawn in when the cell already holds a value.
+    """
+    def dirty_rect(self):
+        return self._dirty_area
+
     """
     This function sets whether or not the cell's value can be changed. Changeable values are those that were not set
     in stone for the original board problem given to the user.   
@@ -49,27 +151,20 @@ class Cell:
        
     """
     def draw_solve_gui_cell(self, window, value_correct=True):
-        cell_width = self.board_width / 9
-        cell_height = cell_width
-
-        x = self.col * cell_width
-        y = self.row * cell_height
-
         # Cover up any old/wrong numbers with a white rectangle.
-        # Changes to x, y were made just to cover the middle bits and leave the border black.
-        pygame.draw.rect(window, (255, 255, 255), (x + 5, y + 5, cell_width - 10, cell_width - 10))
+        # The inner rectangle covers just the middle bits and leaves the border black.
+        pygame.draw.rect(window, (255, 255, 255), self.inner_rect)
 
         color = (0, 255, 0)
         if not value_correct:
             color = (255, 0, 0)
 
-        pygame.draw.rect(window, color, (x + 5, y + 5, cell_width - 10, cell_width - 10), self.line_thickness)
+        pygame.draw.rect(window, color, self.inner_rect, self.line_thickness)
 
-        font = pygame.font.SysFont("comicsans", 40)
-        text = font.render(str(self.value), True, (0, 0, 0))
+        text, text_width, text_height = get_glyph(self.value, (0, 0, 0))
 
-        x += (cell_width - text.get_width()) / 2
-        y += (cell_height - text.get_height()) / 2
+        x = self.x + (self.cell_width - text_width) / 2
+        y = self.y + (self.cell_height - text_height) / 2
         window.blit(text, (x, y))
 
     """
@@ -79,28 +174,22 @@ class Cell:
     being clicked on, then draw a green square around the highlighted bit of board. 
     """
     def draw_cell(self, window):
-        font = pygame.font.SysFont('comicsans', 40)
-
-        # width and height, here, are board widths
-        cell_width = self.board_width / 9
-        cell_height = cell_width
-
-        x = self.col * cell_width
-        y = self.row * cell_height
+        x = self.x
+        y = self.y
 
         #Draw temp
         if self.temp != 0 and self.value == 0:
             # the 128s code for the color, True for words to have smooth edges
-            temp_text = font.render(str(self.temp), True, (128,128,128))
+            temp_text, temp_width, temp_height = get_glyph(self.temp, (128, 128, 128))
 
             # Puts the text on the screen at certain coordinates
             window.blit(temp_text, (x + self.line_thickness, y + self.line_thickness))
 
         # Draw value
         elif self.value != 0:
-            text = font.render(str(self.value), True, (0, 0, 0))
-            x += (cell_width - text.get_width()) / 2
-            y += (cell_height - text.get_height()) / 2
+            text, text_width, text_height = get_glyph(self.value, (0, 0, 0))
+            x += (self.cell_width - text_width) / 2
+            y += (self.cell_height - text_height) / 2
             window.blit(text, (x, y))
 
         # If selected, then draw the green square around the highlighted board
@@ -108,5 +197,6 @@ class Cell:
             if self.value != 0:
                 x -= 25
                 y -= 15
-            # Surface, color, left, top, width, height, thickness
-            pygame.draw.rect(window, (0, 255, 0), (x, y, cell_width, cell_height), self.line_thickness)
\ No newline at end of file
+            # Move the reusable square into place rather than building a fresh tuple
+            self.select_rect.topleft = (x, y)
+            pygame.draw.rect(window, (0, 255, 0), self.select_rect, self.line_thickness)
\ No newline at end of file
@@ -1 +1,6 @@
-NUM_CELLS = 81
\ No newline at end of file
+NUM_CELLS = 81
+
+# The fixed size of the game window. The drawing code reads these instead of asking SDL for the surface size on every
+# call, since the window never changes size for the life of the program.
+SCREEN_WIDTH = 540
+SCREEN_HEIGHT = 600
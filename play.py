@@ -23,53 +23,70 @@ The timer in the bottom right corner will tell you how long it took you to solve
 
 """
 
-import pygame, time, copy
+import pygame, time
 from pygame.locals import *
-from sudoku import make_puzzle_board, valid_move, solve_board_possible
+from sudoku import solve_board_possible
 from board import Board
-from cell import Cell
-from config import NUM_CELLS
+from cell import Cell, render_glyph
+from config import NUM_CELLS, SCREEN_WIDTH, SCREEN_HEIGHT
+import solver_numba
 
 """
-This function formats the time, given in seconds, as a string. 
+This function formats the time, given in seconds, as an h:mm:ss string. The minutes and seconds are zero padded and
+properly reduced, so 3600 seconds comes out as 1:00:00 and not 0:60:0.
 """
 
 
 def format_time(secs):
-    sec = secs % 60
-    minute = secs // 60
-    hour = minute // 60
+    minute, sec = divmod(secs, 60)
+    hour, minute = divmod(minute, 60)
 
-    return str(hour) + ":" + str(minute) + ":" + str(sec)
+    return f"{hour}:{minute:02d}:{sec:02d}"
 
 
 """
-This function draws the time onto the surface on the lower right corner. 
+This function draws the time onto the surface on the lower right corner. The strip where the old time was is covered
+up with white first, and the rectangle that was repainted is returned so the caller can update only that bit of the
+screen.
 """
 
+# The rectangle the time was last drawn in, so the next draw knows how much to cover up.
+_LAST_TIME_RECT = None
+
 
 def draw_time(window, play_time):
-    font = pygame.font.SysFont("comicsans", 40)
-    text = font.render("Time: " + format_time(play_time), True, (0, 0, 0))
+    global _LAST_TIME_RECT
+    # Rendered fresh rather than through the glyph cache: the string is different every second, so caching it would
+    # only pile up dead Surfaces.
+    text, text_width, text_height = render_glyph("Time: " + format_time(play_time), (0, 0, 0))
+
+    time_rect = pygame.Rect(SCREEN_WIDTH - text_width, SCREEN_HEIGHT - text_height, text_width, text_height)
+
+    clear_rect = time_rect
+    if _LAST_TIME_RECT is not None:
+        clear_rect = time_rect.union(_LAST_TIME_RECT)
+
+    window.fill((255, 255, 255), clear_rect)
+    window.blit(text, time_rect)
+    _LAST_TIME_RECT = time_rect
 
-    width, height = pygame.display.get_surface().get_size()
-    window.blit(text, (width - text.get_width(), height - text.get_height()))
+    return clear_rect
 
 
 """
-This function redraws the game to account for changes made. It re-fills the window, draws the timer, and then redraws
-the grid and the board. 
+This function redraws the game to account for changes made. It redraws the changed parts of the grid and the board,
+draws the timer, and returns the list of rectangles that were repainted so only those get pushed to the screen.
 """
 
 
 def redraw_window(win, board, clock):
-    win.fill((255, 255, 255))
+    # Draw grid and board
+    dirty_rects = board.draw(win)
 
     # Draw the timer position
-    draw_time(win, clock)
+    dirty_rects.append(draw_time(win, clock))
 
-    # Draw grid and board
-    board.draw(win)
+    return dirty_rects
 
 
 """
@@ -117,23 +134,35 @@ to play, continually checks for key input in order to update the game.
 def play():
     pygame.init()
 
-    screen_width = 540
-    screen_height = 600
-
-    win = pygame.display.set_mode((screen_width, screen_height))
+    win = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Play Sudoku!")
 
     level = get_level()
-    board = Board(screen_width, screen_width, level, win)
+    board = Board(SCREEN_WIDTH, SCREEN_WIDTH, level, win)
     key = None
 
     start = time.time()
 
+    # Cap the loop at 30 frames a second so a burst of events can't redraw faster than that, and keep track of the
+    # last second drawn so idle frames can skip the redraw altogether.
+    clock = pygame.time.Clock()
+    last_play_time = None
+
+    # A 1 Hz timer event keeps the clock on screen ticking; between that and real input the loop sleeps instead of
+    # polling, so the process uses no CPU at all while the player is thinking.
+    pygame.time.set_timer(pygame.USEREVENT, 1000)
+
+    # Paint the first frame up front, since the loop below sleeps until an event arrives.
+    pygame.display.update(redraw_window(win, board, 0))
+    last_play_time = 0
+
     while True:
+        # Sleep until something happens, then drain whatever queued up behind it.
+        events = [pygame.event.wait()] + pygame.event.get()
+
         play_time = round(time.time() - start)
-        draw_time(win, play_time)
 
-        for event in pygame.event.get():
+        for event in events:
             if event.type == QUIT:
                 pygame.quit()
 
@@ -161,17 +190,25 @@ def play():
 
                 # Currently solve_board_gui not working
                 if board.clicked_on_button(pygame.mouse.get_pos()):
-                    test_puzzle = [[board.puzzle[i][j].value for j in range(board.num_cols)] for i in
-                                   range(board.num_rows)]
+                    # Slice-copy the board's int mirror instead of reading all 81 Cell objects; the solvers mutate
+                    # their input, so they get their own copy.
+                    test_puzzle = [row[:] for row in board._int_grid]
+
+                    # Check solvability with the compiled solver when Numba is installed; otherwise use the pure
+                    # Python one.
+                    if solver_numba.NUMBA_AVAILABLE:
+                        solvable = solver_numba.solve_board_possible_fast(test_puzzle)
+                    else:
+                        solvable = solve_board_possible(test_puzzle)
 
                     # If is not possible to solve, then reset board to original position
-                    if not solve_board_possible(test_puzzle):
+                    if not solvable:
                         board.reset_board(win)
                         board.draw(win)
                         pygame.display.update()
                         pygame.time.delay(100)
 
-                    board.solve_board_gui(board)
+                    board.solve_board_gui()
                     print("Done.")
 
                 if selected_cell is not None:
@@ -186,11 +223,16 @@ def play():
             row, col = board.selected_cell
             board.puzzle[row][col].temp = key
 
-        # Redraw the board according the the changes
-        redraw_window(win, board, play_time)
+        # Redraw the board according the the changes, but only when something changed or the timer ticked over;
+        # otherwise the frame is free.
+        if board.needs_redraw() or play_time != last_play_time:
+            dirty_rects = redraw_window(win, board, play_time)
+
+            # Update only the changed parts of the display
+            pygame.display.update(dirty_rects)
+            last_play_time = play_time
 
-        # Update the display
-        pygame.display.update()
+        clock.tick(30)
 
 
 def main():
@@ -0,0 +1,15 @@
+"""
+This builds the optional compiled solver. Run
+
+    python setup.py build_ext --inplace
+
+and sudoku.py will pick the compiled module up automatically. The game still works without it; solving is just slower.
+"""
+
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(
+    name="play-sudoku-solver",
+    ext_modules=cythonize(["_sudoku_solver.pyx"]),
+)
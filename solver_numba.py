@@ -0,0 +1,275 @@
+"""
+This is an optional, much faster version of the backtracking solver, compiled to machine code with Numba. The pure
+Python solve_board_possible in sudoku.py can take up to a minute on a hard board; the compiled version finishes the
+same search in milliseconds.
+
+Numba and NumPy are not required to play the game. If they are not installed, NUMBA_AVAILABLE is False and callers
+fall back on the pure Python solver. When they are installed, the first call pays a few seconds of compile time, and
+cache=True saves the compiled code to disk so later runs skip even that.
+
+The kernels here mirror the pure Python solver's search exactly: bit (v - 1) of a row, column or box mask says value
+v is taken there, the next cell filled is always the empty cell with the fewest candidates, and the search is a
+plain loop over explicit stack arrays instead of recursion, which Numba compiles far better than deep call chains.
+"""
+
+try:
+    import numba
+    import numpy as np
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    """
+    This function builds the three mask arrays from the values already on the grid: bit (v - 1) of row_mask[r] is set
+    when value v is already somewhere in row r, and likewise for columns and boxes.
+    """
+
+    @numba.njit(cache=True)
+    def build_masks_nb(grid):
+        row_mask = np.zeros(9, np.int32)
+        col_mask = np.zeros(9, np.int32)
+        box_mask = np.zeros(9, np.int32)
+
+        for r in range(9):
+            for c in range(9):
+                val = grid[r, c]
+                if val != 0:
+                    bit = 1 << (val - 1)
+                    row_mask[r] |= bit
+                    col_mask[c] |= bit
+                    box_mask[(r // 3) * 3 + c // 3] |= bit
+
+        return row_mask, col_mask, box_mask
+
+    """
+    This function picks the empty cell with the fewest candidate values left, exactly like most_constrained_cell in
+    sudoku.py: no empty cells comes back as (-1, 0), and a cell with no candidates at all (a dead end) as (-1, -1).
+    """
+
+    @numba.njit(cache=True)
+    def most_constrained_nb(grid, row_mask, col_mask, box_mask):
+        best_pos = -1
+        best_bits = 0
+        best_count = 10
+
+        for pos in range(81):
+            r = pos // 9
+            c = pos % 9
+
+            if grid[r, c] == 0:
+                bits = ~(row_mask[r] | col_mask[c] | box_mask[(r // 3) * 3 + c // 3]) & 0x1FF
+
+                count = 0
+                b = bits
+                while b:
+                    b &= b - 1
+                    count += 1
+
+                if count == 0:
+                    return -1, -1
+
+                if count < best_count:
+                    best_pos = pos
+                    best_bits = bits
+                    best_count = count
+
+                    # A cell with one candidate is forced; nothing can beat it.
+                    if count == 1:
+                        break
+
+        return best_pos, best_bits
+
+    """
+    This function solves the grid in place and returns whether or not a solution exists. Explicit stack arrays hold,
+    per filled cell, its position, the bit placed there and the candidate bits not yet tried, so backtracking pops an
+    entry, takes the placement back and moves on to that cell's next candidate.
+    """
+
+    @numba.njit(cache=True)
+    def solve_jit(grid):
+        row_mask, col_mask, box_mask = build_masks_nb(grid)
+
+        stack_pos = np.empty(81, np.int8)
+        stack_bit = np.empty(81, np.int32)
+        stack_bits = np.empty(81, np.int32)
+        depth = 0
+
+        while True:
+            pos, bits = most_constrained_nb(grid, row_mask, col_mask, box_mask)
+
+            # No empty cells left, so the grid is solved.
+            if pos == -1:
+                if bits == 0:
+                    return True
+                # A cell with no candidates: fall through and backtrack.
+                bits = 0
+
+            while True:
+                if bits:
+                    # The lowest set bit is the smallest untried value.
+                    bit = bits & -bits
+
+                    val = 0
+                    b = bit
+                    while b:
+                        val += 1
+                        b >>= 1
+
+                    r = pos // 9
+                    c = pos % 9
+                    grid[r, c] = val
+                    row_mask[r] |= bit
+                    col_mask[c] |= bit
+                    box_mask[(r // 3) * 3 + c // 3] |= bit
+
+                    stack_pos[depth] = pos
+                    stack_bit[depth] = bit
+                    stack_bits[depth] = bits ^ bit
+                    depth += 1
+                    break
+
+                # Out of candidates here; an empty stack means the grid is unsolvable.
+                if depth == 0:
+                    return False
+
+                depth -= 1
+                pos = stack_pos[depth]
+                bit = stack_bit[depth]
+                bits = stack_bits[depth]
+
+                r = pos // 9
+                c = pos % 9
+                grid[r, c] = 0
+                row_mask[r] ^= bit
+                col_mask[c] ^= bit
+                box_mask[(r // 3) * 3 + c // 3] ^= bit
+
+    """
+    This function counts the solutions of the grid, stopping as soon as limit have been found. It is the same search
+    as solve_jit, but completing the grid bumps the count and backtracks to keep looking instead of returning. The
+    grid is scratch space and comes out scrambled when the limit cuts the search short.
+    """
+
+    @numba.njit(cache=True, nogil=True)
+    def count_solutions_jit(grid, limit):
+        row_mask, col_mask, box_mask = build_masks_nb(grid)
+
+        stack_pos = np.empty(81, np.int8)
+        stack_bit = np.empty(81, np.int32)
+        stack_bits = np.empty(81, np.int32)
+        depth = 0
+        count = 0
+
+        while True:
+            pos, bits = most_constrained_nb(grid, row_mask, col_mask, box_mask)
+
+            if pos == -1:
+                if bits == 0:
+                    # One full solution. Backtrack and keep looking for another, unless enough have been found.
+                    count += 1
+                    if count >= limit:
+                        return count
+                bits = 0
+
+            while True:
+                if bits:
+                    bit = bits & -bits
+
+                    val = 0
+                    b = bit
+                    while b:
+                        val += 1
+                        b >>= 1
+
+                    r = pos // 9
+                    c = pos % 9
+                    grid[r, c] = val
+                    row_mask[r] |= bit
+                    col_mask[c] |= bit
+                    box_mask[(r // 3) * 3 + c // 3] |= bit
+
+                    stack_pos[depth] = pos
+                    stack_bit[depth] = bit
+                    stack_bits[depth] = bits ^ bit
+                    depth += 1
+                    break
+
+                # An empty stack means the whole search space has been walked.
+                if depth == 0:
+                    return count
+
+                depth -= 1
+                pos = stack_pos[depth]
+                bit = stack_bit[depth]
+                bits = stack_bits[depth]
+
+                r = pos // 9
+                c = pos % 9
+                grid[r, c] = 0
+                row_mask[r] ^= bit
+                col_mask[c] ^= bit
+                box_mask[(r // 3) * 3 + c // 3] ^= bit
+
+    """
+    This function is the plain Python doorway to the compiled solver. It copies the board into a NumPy int8 grid,
+    solves it, and returns whether or not a solution exists. The board passed in is left untouched.
+    """
+
+    def solve_board_possible_fast(board):
+        grid = np.asarray(board, dtype=np.int8)
+        return bool(solve_nb(grid))
+
+    """
+    These two functions mirror the pure Python functions' contract for sudoku.py: solve_board fills the list-of-lists
+    board in with the solution in place when one exists and leaves it alone when one doesn't, and
+    count_board_solutions counts the board's solutions without touching the board, stopping once limit are found.
+    """
+
+    def solve_board(board):
+        grid = np.asarray(board, dtype=np.int8)
+        if solve_nb(grid):
+            for r in range(9):
+                for c in range(9):
+                    board[r][c] = int(grid[r, c])
+            return True
+        return False
+
+    def count_board_solutions(board, limit=2):
+        grid = np.asarray(board, dtype=np.int8)
+        return int(count_solutions_nb(grid, limit))
+
+    """
+    These two functions are the same doorways for the flat 81-cell boards the generator in sudoku.py works with.
+    """
+
+    def solve_flat_board(flat):
+        grid = np.asarray(flat, dtype=np.int8).reshape(9, 9)
+        if solve_nb(grid):
+            for pos in range(81):
+                flat[pos] = int(grid[pos // 9, pos % 9])
+            return True
+        return False
+
+    def count_flat_solutions(flat, limit=2):
+        grid = np.asarray(flat, dtype=np.int8).reshape(9, 9)
+        return int(count_solutions_nb(grid, limit))
+
+    # The wrappers above call the kernels through the solve_nb/count_solutions_nb names bound here. Prefer the
+    # ahead-of-time build of the kernels (made with python sudoku_aot.py) when it exists: loading it is a plain
+    # module import, with none of the just-in-time compile or cache-load cost. Without the build, bind the jitted
+    # kernels and warm them up once at import instead, so the one-off compile (or cache load) happens before the
+    # player is waiting on a puzzle, not in the middle of generating one. The counter is warmed with limit=1 so it
+    # stops at the empty board's first solution instead of wandering off counting them all. The jitted kernels keep
+    # their own solve_jit/count_solutions_jit names either way, so sudoku_aot.py can always get at their Python
+    # source even when a previous build is already importable.
+    try:
+        from sudoku_native import solve as solve_nb, count_solutions as count_solutions_nb
+    except ImportError:
+        solve_nb = solve_jit
+        count_solutions_nb = count_solutions_jit
+
+        solve_nb(np.zeros((9, 9), np.int8))
+        count_solutions_nb(np.zeros((9, 9), np.int8), 1)
@@ -16,208 +16,339 @@ The idea of seeding the board: https://www.sudokuwiki.org/Sudoku_Creation_and_Gr
 
 """
 
-import random, copy
+import collections
+import multiprocessing
+import random
+import threading
 from config import NUM_CELLS
+import solver_numba
+
+# The solvers work on the board as one flat list of 81 cells, indexed pos = row * 9 + col. BOX_OF[pos] is the index
+# (0-8) of the 3x3 box that flat position pos sits in, worked out once here instead of on every lookup.
+BOX_OF = tuple((r // 3) * 3 + c // 3 for r in range(9) for c in range(9))
+
+# The first row or column index of the 3x3 block each index falls in, looked up by plain indexing instead of a chain
+# of comparisons per call. The block always spans BLOCK_START[i] to BLOCK_START[i] + 2.
+BLOCK_START = (0, 0, 0, 3, 3, 3, 6, 6, 6)
+
+
+"""
+This builds, for every flat cell position, the flat positions of its 20 peers: the other cells of its row, its
+column and its 3x3 block. A number is legal in a cell exactly when none of the cell's peers already hold it, so one
+pass over this list replaces the separate row, column and block scans (which between them read the seven shared
+row/column cells of the block twice).
+
+Parameters: none
+
+Returns: a tuple of 81 tuples of 20 flat positions each.
+"""
+
+
+def build_peers():
+    peers = []
+
+    for pos in range(81):
+        row = pos // 9
+        col = pos % 9
+
+        cells = {row * 9 + i for i in range(9)}
+        cells |= {i * 9 + col for i in range(9)}
+        cells |= {r * 9 + c for r in range(BLOCK_START[row], BLOCK_START[row] + 3)
+                  for c in range(BLOCK_START[col], BLOCK_START[col] + 3)}
+        cells.discard(pos)
+
+        peers.append(tuple(sorted(cells)))
+
+    return tuple(peers)
+
+
+PEERS = build_peers()
+
 
 """
-This function checks whether or not a number can be placed in a certain cell in a certain board so that the number
-doesn't violate the sudoku rule that there can only be one number from 1-9 in each row and column. 
+This function checks whether or not the number being tested can be placed at a certain cell given Sudoku rules, by
+scanning the cell's 20 peers in one go.
 
-Parameters: row number, col number, the number tested, and the board, which is a list of 9 lists for each row on the 
-Sudoku board. 
+Parameters: flat position of the cell (row * 9 + col), the number tested, and the flat board of 81 cells.
 
 Returns: boolean
 """
 
 
-def check_row_col(row, col, num, board):
-    for i in range(9):
-        if col != i and board[row][i] == num:
-            return False
-    for i in range(9):
-        if row != i and board[i][col] == num:
+def valid_move(pos, num, board):
+    for p in PEERS[pos]:
+        if board[p] == num:
             return False
     return True
 
 
 """
-This returns the start and end index of both columns and rows of the 3x3 block boundary on each Sudoku board. 
+This builds the three mask lists from the values already placed on a flat board. Bit (v - 1) of row_mask[r] is set
+when value v is already somewhere in row r, and likewise for columns and boxes.
 
-Parameter: the row or column index of the cell, and the desired start or end for the boundary
+Parameters: the flat board of 81 cells.
 
-Returns: either the start or end index for both columns and rows of the 3x3 block boundary on each Sudoku board.
+Returns: the row, column and box mask lists.
 """
 
 
-def get_block_boundary(index, boundary):
-    if index <= 2:
-        if boundary == "start":
-            return 0
-        elif boundary == "end":
-            return 2
-    elif 3 <= index <= 5:
-        if boundary == "start":
-            return 3
-        elif boundary == "end":
-            return 5
-    elif 6 <= index <= 8:
-        if boundary == "start":
-            return 6
-        elif boundary == "end":
-            return 8
+def build_masks(flat):
+    row_mask = [0] * 9
+    col_mask = [0] * 9
+    box_mask = [0] * 9
+
+    for pos in range(81):
+        val = flat[pos]
+        if val != 0:
+            bit = 1 << (val - 1)
+            row_mask[pos // 9] |= bit
+            col_mask[pos % 9] |= bit
+            box_mask[BOX_OF[pos]] |= bit
+
+    return row_mask, col_mask, box_mask
 
 
 """
-This function checks whether or not the number being tested is valid within the 3x3 block it resides. The number is 
-valid when the number is the only one of its kind within the 3x3 block. 
+These two functions move a board between its two shapes: the list of 9 row lists that the rest of the game deals in,
+and the flat bytearray of 81 cells that everything in this module works on. Indexing a flat board is one subscript
+where board[row][col] is two (fetch the row list, then index it), which adds up over the thousands of cell reads a
+solve makes. A bytearray stores each cell in one byte instead of a pointer to a full int object, so a board is 81
+bytes instead of kilobytes, it sits in one cache line-friendly block, and copying one is a single memcpy.
 
-Parameters: row number, col number, the number tested, and the board, which is a list of 9 lists for each row on the 
-Sudoku board. 
+Parameters: a board in the other shape.
 
-Returns: boolean
+Returns: the board, converted.
 """
 
 
-def check_block(row, col, num, board):
-    for r in range(get_block_boundary(row, "start"), get_block_boundary(row, "end") + 1):
-        for c in range(get_block_boundary(col, "start"), get_block_boundary(col, "end") + 1):
-            if r != row and c != col and board[r][c] == num:
-                return False
-    return True
+def flatten_board(board):
+    return bytearray(board[r][c] for r in range(9) for c in range(9))
+
+
+def unflatten_board(flat):
+    return [list(flat[r * 9:(r + 1) * 9]) for r in range(9)]
 
 
 """
-This function checks whether or not the number being tested is valid and can be placed in the row and column given 
-Sudoku rules. 
+This picks the empty cell the solver should fill next: the one with the fewest candidate values left, found with one
+scan over the 81 cells counting the bits of each cell's candidate mask. Filling the most constrained cell first
+prunes the search tree enormously compared to just taking cells in row-major order, and a cell with no candidates at
+all means the board is already a dead end, so the scan gives that up immediately.
 
-Parameters: row number, col number, the number tested, and the board, which is a list of 9 lists for each row on the 
-Sudoku board. 
+Parameters: the flat board and the three mask lists.
 
-Returns: boolean
+Returns: the chosen flat position and its candidate mask. No empty cells left comes back as (-1, 0), and a dead end
+comes back as (-1, -1).
 """
 
 
-def valid_move(row, col, num, board):
-    return check_row_col(row, col, num, board) and check_block(row, col, num, board)
+def most_constrained_cell(board, row_mask, col_mask, box_mask):
+    best_pos = -1
+    best_bits = 0
+    best_count = 10
+
+    for pos in range(81):
+        if board[pos] == 0:
+            bits = ~(row_mask[pos // 9] | col_mask[pos % 9] | box_mask[BOX_OF[pos]]) & 0x1FF
+            count = bits.bit_count()
+
+            if count == 0:
+                return -1, -1
+
+            if count < best_count:
+                best_pos = pos
+                best_bits = bits
+                best_count = count
+
+                # A cell with one candidate is forced; nothing can beat it.
+                if count == 1:
+                    break
+
+    return best_pos, best_bits
 
 
 """
-This function checks whether or not the filled Sudoku board created is a valid Sudoku board. 
+This is the core of the solver, working on the flat board. Testing a candidate is three ORs of the masks and a bit
+test instead of a scan over the 27 cells of the row, column and box, and the candidates of a cell come straight out
+of the combined mask by peeling off its set bits. The cell filled at each step is the most constrained one, smallest
+value first.
+
+The search is a plain loop over an explicit stack instead of recursion: each stack entry remembers a filled cell,
+the bit placed in it, and the candidate bits not yet tried, so backtracking pops an entry, takes the placement back
+and moves on to the cell's next candidate. That spends no time building and tearing down Python call frames, which
+the recursive version paid for on every single cell.
 
-Parameters: board, which is a list of 9 lists for each row on the 
-Sudoku board. 
+Parameters: the flat board and the three mask lists.
 
 Returns: boolean
 """
 
 
-def is_valid_board(board):
-    for r in range(9):
-        for c in range(9):
-            if not valid_move(r, c, board[r][c], board) or board[r][c] == 0:
+def solve_flat(board, row_mask, col_mask, box_mask):
+    # Each entry is (pos, bit placed there, candidate bits not yet tried there).
+    stack = []
+
+    while True:
+        pos, bits = most_constrained_cell(board, row_mask, col_mask, box_mask)
+
+        # No empty cells left, so the board is solved.
+        if pos == -1:
+            if bits == 0:
+                return True
+            # A cell with no candidates: fall through and backtrack.
+            bits = 0
+
+        while True:
+            if bits:
+                # The lowest set bit is the smallest untried value.
+                bit = bits & -bits
+
+                board[pos] = bit.bit_length()
+                row_mask[pos // 9] |= bit
+                col_mask[pos % 9] |= bit
+                box_mask[BOX_OF[pos]] |= bit
+
+                stack.append((pos, bit, bits ^ bit))
+                break
+
+            # Out of candidates here. Take back the most recent placement and try that cell's next candidate; an
+            # empty stack means every choice has been exhausted and the board is unsolvable.
+            if not stack:
                 return False
-    return True
+
+            pos, bit, bits = stack.pop()
+
+            board[pos] = 0
+            row_mask[pos // 9] ^= bit
+            col_mask[pos % 9] ^= bit
+            box_mask[BOX_OF[pos]] ^= bit
 
 
 """
-This solves the Sudoku board given. The logic, in pseudocode:
-for all r in row:
-    for all c in colums: 
-        if the cell is empty:
-            for all numbers in 1-9:
-                Test out whether or not the resulting board can be solved if the number is placed into the empty cell.
-                if so, then return true. 
-                Otherwise, replace the number with 0 and try the next number. 
-            All of the numbers have been tried and there is no solution. Return False. 
-The board is complete, so it must be solvable. Return True. 
+This solves the Sudoku board given, with backtracking: fill the first empty cell with the smallest value that doesn't
+clash, and back up and try the next value whenever a cell runs out of values. The work happens on a flat copy of the
+board with the bit masks above; the board passed in is filled in with the solution when one exists and left alone
+when one doesn't.
 
-Parameters: board, which is a list of 9 lists for each row on the Sudoku board. 
+Parameters: board, which is a list of 9 lists for each row on the Sudoku board.
 
 Returns: boolean
 """
 
 
 def solve_board_possible(board):
-    for row in range(9):
-        for col in range(9):
-            if board[row][col] == 0:
-                for num in range(1, 10):
-                    if valid_move(row, col, num, board):
-                        board[row][col] = num
-                        if solve_board_possible(board):
-                            return True
-                        board[row][col] = 0
-                return False
-    return True
+    flat = flatten_board(board)
+    row_mask, col_mask, box_mask = build_masks(flat)
+
+    if solve_flat(flat, row_mask, col_mask, box_mask):
+        for row in range(9):
+            for col in range(9):
+                board[row][col] = flat[row * 9 + col]
+        return True
+
+    return False
 
 
 """
 This creates a bare-bones template for the creation of a filled Sudoku board. This method of starting a board is inspired
-by AC Stuart's paper on Sudoku creation. 9 cells are chosen and given 1 number from 1-9; 1-9 appear once through all 9
-cells. This is not guaranteed to make a valid or solvable board. 
+by AC Stuart's paper on Sudoku creation. The three 3x3 boxes down the main diagonal are each filled with their own
+random shuffle of 1-9. Those boxes share no row, column or box with each other, so the seed can never contradict
+itself, and the solver starts from 27 placed cells instead of 9. The old one-random-cell-per-row seeding regularly
+produced unsolvable seeds that forced the whole solve to be thrown away and re-seeded.
 
-Parameters: board, which is a list of 9 lists for each row on the Sudoku board. 
+Parameters: the flat board of 81 cells.
 
-Returns: board, which is a list of 9 lists for each row on the Sudoku board. 
+Returns: the flat board of 81 cells.
 """
 
 
 def seed_board(board):
-    nums_left = list(range(1, 10))
+    for box in range(3):
+        start = box * 3
+        # One C-level call for a shuffled 1-9, instead of building a list and shuffling it in place.
+        digits = random.sample(range(1, 10), 9)
 
-    for row in range(9):
-        col = random.randint(0, 8)
-        nums_left_index = random.randint(0, len(nums_left) - 1)
-
-        seed_num = nums_left.pop(nums_left_index)
-
-        board[row][col] = seed_num
+        for i in range(3):
+            for j in range(3):
+                board[(start + i) * 9 + start + j] = digits[i * 3 + j]
 
     return board
 
 
 """
-This creates a possible Sudoku solution. It creates an empty board, seeds the board, and returns a solved board. 
+This creates a possible Sudoku solution. It creates an empty board, seeds the board, and returns a solved board.
 
 Paramters: none
 
-Returns: board, which is a list of 9 lists for each row on the Sudoku board. 
+Returns: the solved flat board of 81 cells.
 """
 
 
 def make_possible_sudoku_solution():
     # Creates an empty board
-    board = []
-    for i in range(9):
-        board.append([0] * 9)
+    board = bytearray(81)
 
-    # Seed 9 cells randomly with numbers 1-9
+    # Seed the three diagonal boxes with numbers 1-9
     board = seed_board(board)
 
-    # if cannot solve the board, then re-seed
-    while not solve_board_possible(board):
+    # if cannot solve the board, then re-seed. A diagonal-box seed is always solvable, so this no longer triggers;
+    # it stays as a cheap safety net.
+    while not solve_flat_board(board):
         board = seed_board(board)
 
-    # The reason why this is possible is because lists are passed by reference in Python. So the solve_board_possible
+    # The reason why this is possible is because lists are passed by reference in Python. So the solve_flat_board
     # method automatically changes the board as needed and when the method finishes, board is solved and filled.
+    # There used to be an is_valid_board re-check of the result here, but the solver only ever places values that
+    # pass valid_move, so a solved board cannot come out invalid and the sweep was pure dead work.
     return board
 
 
+# A small stock of ready-made solved boards. Solved boards depend on nothing but the random state, so ones made
+# ahead of time are as good as fresh ones, and make_puzzle_board can grab its starting board here instead of solving
+# one while the player waits. A background thread keeps the stock topped up.
+_SOLVED_POOL = collections.deque(maxlen=8)
+_refill_thread = None
+
+
 """
-This ensures that the Sudoku board, solved and filled, is a valid board. 
+This fills the stock of solved boards back up to its maximum size. It runs on the background thread started by
+solved_board.
 
 Parameters: none
 
-Returns: board, which is a list of 9 lists for each row on the Sudoku board. 
+Returns: nothing
 """
 
 
-def sudoku_solution():
-    board = make_possible_sudoku_solution()
+def _refill_solved_pool():
+    while len(_SOLVED_POOL) < _SOLVED_POOL.maxlen:
+        _SOLVED_POOL.append(make_possible_sudoku_solution())
+
+
+"""
+This hands out a solved Sudoku board: one from the stock when there is one, or a freshly made one when the stock is
+empty (as it is on the very first call). Either way a background thread is set going to top the stock back up, so
+the cost of making solved boards moves off of the caller's path. deque appends and pops are atomic, so the thread
+needs no locking.
 
-    while not is_valid_board(board):
+Parameters: none
+
+Returns: the solved flat board of 81 cells.
+"""
+
+
+def solved_board():
+    global _refill_thread
+
+    if _SOLVED_POOL:
+        board = _SOLVED_POOL.popleft()
+    else:
         board = make_possible_sudoku_solution()
 
+    if _refill_thread is None or not _refill_thread.is_alive():
+        _refill_thread = threading.Thread(target=_refill_solved_pool, daemon=True)
+        _refill_thread.start()
+
     return board
 
 
@@ -264,165 +395,282 @@ Returns: number of solutions
 #     return count
 
 """
-This function solves the board by going backwards. It does solve_board_possible, but backwards. 
+This is the core of the solution counter: the same explicit-stack search as solve_flat, except that completing the
+board bumps a count and backtracks to keep looking instead of returning. The search stops as soon as limit solutions
+exist — proving a board is not unique only ever needs the second solution. Like solve_flat, it always fills the most
+constrained cell next.
 
-Parameters: board, which is a list of 9 lists for each row on the Sudoku board. 
+Parameters: the flat board, the three mask lists, and the counting limit.
 
-Returns: whether or not solving the board is possible. 
+Returns: the number of solutions found, capped at limit.
 """
 
 
-def solve_board_backwards(board):
-    for row in reversed(range(9)):
-        for col in reversed(range(9)):
-            if board[row][col] == 0:
-                for num in reversed(range(1, 10)):
-                    if valid_move(row, col, num, board):
-                        board[row][col] = num
-                        if solve_board_backwards(board):
-                            return True
-                        board[row][col] = 0
-                return False
-    return True
+def count_solutions_flat(board, row_mask, col_mask, box_mask, limit):
+    stack = []
+    count = 0
+
+    while True:
+        pos, bits = most_constrained_cell(board, row_mask, col_mask, box_mask)
+
+        if pos == -1:
+            if bits == 0:
+                # One full solution. Backtrack and keep looking for another, unless enough have been found.
+                count += 1
+                if count >= limit:
+                    return count
+            bits = 0
+
+        while True:
+            if bits:
+                bit = bits & -bits
+
+                board[pos] = bit.bit_length()
+                row_mask[pos // 9] |= bit
+                col_mask[pos % 9] |= bit
+                box_mask[BOX_OF[pos]] |= bit
+
+                stack.append((pos, bit, bits ^ bit))
+                break
+
+            # An empty stack means the whole search space has been walked.
+            if not stack:
+                return count
+
+            pos, bit, bits = stack.pop()
+
+            board[pos] = 0
+            row_mask[pos // 9] ^= bit
+            col_mask[pos % 9] ^= bit
+            box_mask[BOX_OF[pos]] ^= bit
+
 
 """
-This function checks if the solutions of solving the board backwards and forwards is equivalent. If yes, then only 1
-unique solution. If not, multiple solutions possible. 
+This function counts the solutions of the board given, stopping as soon as limit solutions have been found. The old
+uniqueness test solved the whole board twice, forwards and backwards, and compared the results; counting to two does
+at most the same single search and usually far less. The board passed in is left untouched.
 
-Here, although the solve_board_x return booleans, since the boards themselves are passed in by reference, by checking
-whether or not the boards are solvable, the boards themselves are solved. 
+Parameters: board, which is a list of 9 lists for each row on the Sudoku board, and the counting limit.
+
+Returns: the number of solutions found, capped at limit.
+"""
+
+
+def count_solutions(board, limit=2):
+    flat = flatten_board(board)
+
+    return count_solutions_flat(flat, *build_masks(flat), limit)
 
-Parameters: board, which is a list of 9 lists for each row on the Sudoku board. 
 
-Returns: whether or not the board has a unique solution
 """
+These two functions are the flat-board counterparts of solve_board_possible and count_solutions, for the generator,
+which keeps its boards flat the whole way through and only unflattens at the very end. solve_flat_board fills the
+flat board in place when a solution exists; count_flat_solutions works on a scratch copy and leaves the board alone.
+
+Parameters: the flat board of 81 cells (and, for counting, the limit).
+
+Returns: as for the list-of-lists versions.
+"""
+
 
+def solve_flat_board(flat):
+    return solve_flat(flat, *build_masks(flat))
 
-def unique_solution(board):
-    copy_f = copy.deepcopy(board)
-    copy_b = copy.deepcopy(board)
-    solve_board_possible(copy_f)
 
-    solve_board_backwards(copy_b)
+def count_flat_solutions(flat, limit=2):
+    # Copying a bytearray is one memcpy.
+    scratch = bytearray(flat)
 
-    return copy_f == copy_b
+    return count_solutions_flat(scratch, *build_masks(scratch), limit)
+
+
+# Swap in compiled solvers when they are available. The Numba kernels keep the same contracts as the pure Python
+# functions above, just as machine code; the Cython extension (built with python setup.py build_ext --inplace) is
+# tried last so it wins when present.
+if solver_numba.NUMBA_AVAILABLE:
+    solve_board_possible = solver_numba.solve_board
+    count_solutions = solver_numba.count_board_solutions
+    solve_flat_board = solver_numba.solve_flat_board
+    count_flat_solutions = solver_numba.count_flat_solutions
+
+try:
+    from _sudoku_solver import solve as solve_board_possible
+except ImportError:
+    pass
 
 """
-Choose the number of clues according to the level given. Here, 39 is the upper limit for the number of clues a minimal
-puzzle can have. To be clear, this does not create minimal puzzles, but in the case of a minimal puzzle, cap the 
-number of clues at 39. The lower limit number of clues for each puzzle to have only 1 solution is 17.
+The acceptable range of clues (cells left filled in) for each level, looked up by level name instead of re-running
+chains of string comparisons on the generator's hot path. Here, 39 is the upper limit for the number of clues a
+minimal puzzle can have. To be clear, this does not create minimal puzzles, but in the case of a minimal puzzle, cap
+the number of clues at 39. The lower limit number of clues for each puzzle to have only 1 solution is 17.
 
-The standards here are general guidelines given for Sudoku. 
+The standards here are general guidelines given for Sudoku.
+"""
+LEVEL_RANGES = {"easy": (36, 39), "medium": (27, 35), "hard": (19, 26)}
 
-Parameters: a string for easy, medium, or hard. 
 
-Returns: a random integer in a range of numbers for each level. 
+"""
+Choose the number of clues according to the level given.
+
+Parameters: a string for easy, medium, or hard.
+
+Returns: a random integer in a range of numbers for each level.
 """
 
 
 def choose_num_clues(level):
-    if level == "easy":
-        return random.randint(36, 39)
-    elif level == "medium":
-        return random.randint(27, 35)
-    elif level == "hard":
-        return random.randint(19, 26)
+    min_clues, max_clues = LEVEL_RANGES[level]
+    return random.randint(min_clues, max_clues)
 
 """
-This function generates a random list of all of the cell indexes for the make_puzzle_board function to try to remove 
-from a filled Sudoku board. A cell: [row index, col index].
+This function generates a random list of all of the cell indexes for the make_puzzle_board function to try to remove
+from a filled Sudoku board. A cell is its flat position, row * 9 + col, which is a plain int instead of a two element
+list that has to be compared element by element.
 
 Paramters: none
 
-Returns: a list of all of the cell indexes, shuffled, for the board. 
+Returns: a list of all of the cell indexes, shuffled, for the board.
 """
 
 
 def gen_cell_indexes():
-    cells = []
-
-    for row in range(9):
-        for col in range(9):
-            cells.append([row, col])
-
-    random.shuffle(cells)
-
-    return cells
+    # random.sample builds and shuffles the list in one C-level call.
+    return random.sample(range(NUM_CELLS), NUM_CELLS)
 
 
 """
-This determines whether or not the board has reached the number of clues it needs for a certain level. Clues are cells
-that are left in. 
+This decides, without any search, whether taking a value out of a cell is guaranteed to keep the puzzle's solution
+unique. The removed value is forced back into its cell whenever the cell has no other candidate left, or whenever
+no other empty cell of its row, column or box could legally take the value. A forced value comes out the same in
+every solution, so removing it cannot open up a second solution, and the expensive solution count can be skipped.
+The check only ever looks at values already placed on the board, which stay placed in every solution, so a "forced"
+answer is always safe; a "not forced" answer just means the full count has to decide.
 
-Paramters: number of empty cells and the level of those cells
+Parameters: the flat board, the three mask lists for it (with the removed value already taken out), the emptied
+cell's flat position, and the removed value's bit.
 
 Returns: boolean
 """
 
 
-def reached_target_level(num_empty_cells, level):
-    num_clues = NUM_CELLS - num_empty_cells
-    return (level == "easy" and 36 <= num_clues <= 39) \
-           or (level == "medium" and 27 <= num_clues <= 35) \
-           or (level == "hard" and 19 <= num_clues <= 26)
+def removal_is_forced(board, row_mask, col_mask, box_mask, pos, bit):
+    row = pos // 9
+    col = pos % 9
+
+    # The cell itself has no other candidate.
+    if ~(row_mask[row] | col_mask[col] | box_mask[BOX_OF[pos]]) & 0x1FF == bit:
+        return True
+
+    # No other empty cell of the row could take the value (its column or box already has it).
+    base = row * 9
+    for c in range(9):
+        p = base + c
+        if p != pos and board[p] == 0 and not (col_mask[c] | box_mask[BOX_OF[p]]) & bit:
+            break
+    else:
+        return True
+
+    # No other empty cell of the column could take it.
+    for r in range(9):
+        p = r * 9 + col
+        if p != pos and board[p] == 0 and not (row_mask[r] | box_mask[BOX_OF[p]]) & bit:
+            break
+    else:
+        return True
+
+    # No other empty cell of the box could take it.
+    for r in range(BLOCK_START[row], BLOCK_START[row] + 3):
+        for c in range(BLOCK_START[col], BLOCK_START[col] + 3):
+            p = r * 9 + c
+            if p != pos and board[p] == 0 and not (row_mask[r] | col_mask[c]) & bit:
+                return False
+
+    return True
+
 
 """
-This removes cells in a random order to try and create a Sudoku puzzle according to the desired level, which is graded 
-by the number of clues (or remaining cells) wished to be included in the finished puzzle. 
+This removes cells in a random order to try and create a Sudoku puzzle according to the desired level, which is graded
+by the number of clues (or remaining cells) wished to be included in the finished puzzle.
 
-This function tries to remove a cell. If the cell is removable and the resulting board produces a board that has a 
-unique solution, then leave the cell empty. Otherwise, move on to the next cell. Keep a running list of the cells that
-have been removed. Keep trying to remove cells until the target number of clues has been reached. If the target number
-of clues is unreachable, then try again with a new board and reset the function. 
+This function tries to remove a cell. If the cell is removable and the resulting board produces a board that has a
+unique solution, then leave the cell empty. Otherwise, move on to the next cell. Every cell appears exactly once in
+the shuffled list, so one pass tries each cell exactly once and no list of already-emptied cells has to be kept or
+searched. Keep trying to remove cells until the target number of clues has been reached. If the target number of
+clues is unreachable, then try again with a new board and reset the function.
 
-Parameters: board, which is a list of 9 lists for each row on the Sudoku board, 
-and a level (easy, medium, hard). 
+Parameters: board, which is a list of 9 lists for each row on the Sudoku board,
+and a level (easy, medium, hard).
 
-Returns: board, which is a list of 9 lists for each row on the Sudoku board. 
+Returns: board, which is a list of 9 lists for each row on the Sudoku board.
 """
 
 
 def make_puzzle_board(level):
-    board = sudoku_solution()
-    count_empty_cells = 0
-    cells_to_empty = gen_cell_indexes()
-    target_empty_cells = NUM_CELLS - choose_num_clues(level)
-    emptied_cells = []
-
-    while len(cells_to_empty) != 0:
-        cells_to_empty_len = len(cells_to_empty)
-        for cell in cells_to_empty:
-            if cell not in emptied_cells:
-                row = cell[0]
-                col = cell[1]
-
-                copy_board = copy.deepcopy(board)
-                copy_board[row][col] = 0
-
-                #if num_solutions(copy_board) == 1: Too slow
-                if unique_solution(copy_board):
-                    count_empty_cells += 1
-                    board[row][col] = 0
-                    emptied_cells += [cell]
-
-                if count_empty_cells == target_empty_cells:
-                    return board
-
-                # If within target level, then return the board
-                if level == "hard":
-                    if reached_target_level(count_empty_cells, level):
-                        return board
-
-        # If it is impossible to reach the desired number of empty cells:
-        if len(cells_to_empty) == cells_to_empty_len:
-            if reached_target_level(count_empty_cells, level):
-                return board
-            # Otherwise, try a new board and reset the function.
-            board = sudoku_solution()
-            count_empty_cells = 0
-            cells_to_empty = gen_cell_indexes()
-            target_empty_cells = NUM_CELLS - choose_num_clues(level)
-            emptied_cells = []
+    # The level's clue range, looked up once per puzzle instead of on every cell via the old reached_target_level.
+    min_clues, max_clues = LEVEL_RANGES[level]
+
+    while True:
+        board = solved_board()
+        # The masks are kept up to date across removals, both for removal_is_forced and so an undone removal is two
+        # bit flips instead of a rebuild.
+        row_mask, col_mask, box_mask = build_masks(board)
+        count_empty_cells = 0
+
+        # The clue count to stop at, drawn fresh per attempt. Returning at a fixed point in the range instead would
+        # mean every puzzle of a level has the exact same number of clues, since the count steps down one removal at
+        # a time.
+        target_clues = choose_num_clues(level)
+
+        for pos in gen_cell_indexes():
+            # Take the value out, and put it back if the puzzle stops having exactly one solution. Most removals
+            # leave the value forced, which removal_is_forced proves from the masks alone; only the rest need the
+            # actual solution count, which works on its own copy, so no board copy is needed here at all.
+            removed_val = board[pos]
+            bit = 1 << (removed_val - 1)
+            row, col = divmod(pos, 9)
+            box = BOX_OF[pos]
+
+            board[pos] = 0
+            row_mask[row] ^= bit
+            col_mask[col] ^= bit
+            box_mask[box] ^= bit
+
+            #if num_solutions(copy_board) == 1: Too slow
+            if removal_is_forced(board, row_mask, col_mask, box_mask, pos, bit) \
+                    or count_flat_solutions(board, 2) == 1:
+                count_empty_cells += 1
+            else:
+                board[pos] = removed_val
+                row_mask[row] |= bit
+                col_mask[col] |= bit
+                box_mask[box] |= bit
+
+            # If the target clue count has been reached, then return the board. Every level returns the moment it
+            # gets there; only hard used to stop early, leaving easy and medium grinding on past their target.
+            if NUM_CELLS - count_empty_cells <= target_clues:
+                return unflatten_board(board)
+
+        # Ran out of cells to try before reaching the target. If still within the level's range, then the board is
+        # good enough to return; otherwise, the while loop tries again with a new board.
+        if min_clues <= NUM_CELLS - count_empty_cells <= max_clues:
+            return unflatten_board(board)
+
+
+"""
+This makes a batch of puzzles of the given level at once, one per worker process. Every puzzle is generated
+completely independently of the others, so the work splits perfectly across processor cores; a process pool is used
+rather than threads because the work is pure computation and threads would all queue up on the interpreter lock.
+The game itself only ever needs one puzzle at a time, so this is for bulk uses like printing out a puzzle book.
+
+Parameters: a level (easy, medium, hard) and the number of puzzles wanted.
+
+Returns: a list of boards, each of which is a list of 9 lists for each row on the Sudoku board.
+"""
+
+
+def make_puzzles(level, num_puzzles):
+    with multiprocessing.Pool() as pool:
+        return pool.map(make_puzzle_board, [level] * num_puzzles)
 
 
 def main():
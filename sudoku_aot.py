@@ -0,0 +1,30 @@
+"""
+This compiles the Numba solver kernels ahead of time into a plain extension module, sudoku_native. Run
+
+    python sudoku_aot.py
+
+and solver_numba picks the built module up automatically on the next start. Without it the kernels are just-in-time
+compiled instead, which works fine but makes the first run of every fresh process pay the compile (or, with the disk
+cache, a cache load) before the game can generate a puzzle. For something launched fresh each time it is played,
+that start-up cost is most of the time spent, so compiling once here and loading a normal extension module after
+that is the better trade.
+
+The exported functions are the exact kernels from solver_numba, compiled from the same source, so the two paths
+cannot drift apart.
+"""
+
+from numba.pycc import CC
+
+import solver_numba
+
+cc = CC("sudoku_native")
+
+# The grids are 9x9 NumPy int8 arrays, as in solver_numba's wrappers. The jitted dispatchers are referenced by
+# their own solve_jit/count_solutions_jit names rather than the solve_nb/count_solutions_nb call names, which point
+# at a previous build of this module when one is importable.
+cc.export("solve", "b1(i1[:, :])")(solver_numba.solve_jit.py_func)
+cc.export("count_solutions", "i8(i1[:, :], i8)")(solver_numba.count_solutions_jit.py_func)
+
+
+if __name__ == "__main__":
+    cc.compile()